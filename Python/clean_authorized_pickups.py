@@ -1,14 +1,19 @@
 import requests
 import time
 import os
+import math
 import argparse
 from requests.auth import HTTPBasicAuth
+from pco_plan import get_total_count, print_plan
 
-BASE_URL = "https://api.planningcenteronline.com/people/v2"
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
 APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
 SECRET = os.environ.get("PCO_SECRET", "")
 HEADERS = {
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
 }
 AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
 
@@ -164,25 +169,49 @@ def search_person_by_name(search_name):
     except:
         return 0, 0
 
+def plan_parse_authorized_pickups(names_per_entry):
+    """Estimate the requests and runtime of the pickup parser without changing anything.
+
+    Each name costs three lookups (person, emails, phone numbers), and the
+    number of names per entry can't be counted without reading every entry,
+    so it is taken as an assumption.
+    """
+    auth_pickup = get_field_definition_id("Authorized Pickups")
+    total, rate_headers, latency = get_total_count(
+        f"{BASE_URL}/field_data", HEADERS, AUTH, {"where[field_definition_id]": auth_pickup}
+    )
+    print(f"Found {total} Authorized Pickups entries (assuming {names_per_entry} names each).")
+    reads = 2 + math.ceil(total / 100) + math.ceil(3 * names_per_entry * total)
+    # Only the field data pages sleep between requests
+    print_plan(reads, total, rate_headers, latency, delay=0)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse Authorized Pickups into 'name;email;phone' entries")
+    parser.add_argument("--plan", action="store_true", help="Only estimate requests and runtime")
+    parser.add_argument("--names-per-entry", type=float, default=2.0, help="Assumed pickup names per entry for --plan")
+    args = parser.parse_args()
+
     try:
-        auth_pickup = get_field_definition_id("Authorized Pickups")
-        auth_pickup_parsed = get_field_definition_id("Authorized Pickups Parsed")
-        field_data = get_field_data(auth_pickup)
-        for entry in field_data:
-            i = 0
-            while '' in entry["value"]:
-                entry["value"].remove('')
-            for name in entry["value"]:
-                email, phone = search_person_by_name(name)
-                entry["value"][i] = f"{name};{email};{phone}"
-                i = i + 1
-            entry["value"] = '|'.join(n for n in entry["value"])
-            if "|" not in entry["value"]:
-                entry["value"] = entry["value"] + "|"
-
-            print(entry)
-            create_field_data(entry, auth_pickup_parsed)
+        if args.plan:
+            plan_parse_authorized_pickups(args.names_per_entry)
+        else:
+            auth_pickup = get_field_definition_id("Authorized Pickups")
+            auth_pickup_parsed = get_field_definition_id("Authorized Pickups Parsed")
+            field_data = get_field_data(auth_pickup)
+            for entry in field_data:
+                i = 0
+                while '' in entry["value"]:
+                    entry["value"].remove('')
+                for name in entry["value"]:
+                    email, phone = search_person_by_name(name)
+                    entry["value"][i] = f"{name};{email};{phone}"
+                    i = i + 1
+                entry["value"] = '|'.join(n for n in entry["value"])
+                if "|" not in entry["value"]:
+                    entry["value"] = entry["value"] + "|"
+
+                print(entry)
+                create_field_data(entry, auth_pickup_parsed)
 
     except Exception as e:
         print(f"An error occurred: {e}")
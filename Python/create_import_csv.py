@@ -1,5 +1,9 @@
+import argparse
 import csv
+import json
+import os
 from datetime import datetime
+from functools import lru_cache
 
 # Helper Functions
 def format_phone(phone):
@@ -51,7 +55,7 @@ def get_status_and_membership(member_status):
     else:
         return "Active", "Member"
 
-def format_birthdate(birth_month_day, age):
+def format_birthdate(birth_month_day, age, current_year):
     """Format birthdate from MM/DD and age."""
     if not birth_month_day:
         return ""
@@ -72,124 +76,189 @@ def format_anniversary(wedding_month_day):
     except ValueError:
         return ""
 
-# File paths
-input_file = "input.csv"
-output_file = "output.csv"
-
-# Define output headers
-output_headers = [
-    "remote_id", "First Name", "Middle Name", "Last Name",
-    "Birthdate", "Anniversary", "Gender", "Grade", "Medical Notes", "Marital Status", "Status", "Membership",
-    "Home Address Street Line 1", "Home Address City", "Home Address State", "Home Address Zip Code",
-    "Mobile Phone Number", "Home Phone Number", "Work Phone Number",
-    "Home Email", "Household ID", "Household Name", "Household Primary Contact",
-    "Baptized", "Baptism Date", "Member By", "Membership Date", "Sunday School", "Small Group",
-    "Emergency Contact", "Emergency Phone", "Allergies", "Authorized Pickup"
-]
-
-# Process CSV
-with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8', newline='') as outfile:
-    reader = csv.DictReader(infile)
-    writer = csv.DictWriter(outfile, fieldnames=output_headers)
-    writer.writeheader()
+def format_grade(grade):
+    """Map school grade to the text written in the Grade column."""
+    value = map_grade(grade)
+    return "" if value is None or value == "" else str(value)
 
+def format_medical_notes(allergy):
+    """Lowercase allergy notes, treating 'no' as empty."""
+    medical_notes = allergy.lower()
+    return "" if medical_notes == "no" else medical_notes
+
+def get_status(member_status):
+    """Status column from Member Status."""
+    return get_status_and_membership(member_status)[0]
+
+def get_membership(member_status):
+    """Membership column from Member Status."""
+    return get_status_and_membership(member_status)[1]
+
+def format_household_name(last_name):
+    """Household name from last name."""
+    return f"{last_name} Household" if last_name else ""
+
+def get_household_primary_contact(relationship, primary_contact):
+    """TRUE for heads of household or people flagged as primary contact."""
+    if relationship == "Head of Household" or primary_contact.lower() == "yes":
+        return "TRUE"
+    return ""
+
+def get_emergency_contact(emergency_contact, primary_contact, first_name, secondary_contact):
+    """Use the emergency contact, falling back to whichever contact isn't this person."""
+    if emergency_contact:
+        return emergency_contact
+    if primary_contact:
+        primary_first_name = primary_contact.split()[0].lower() if primary_contact.split() else ""
+        if primary_first_name != first_name.lower():
+            return primary_contact
+    return secondary_contact
+
+def join_pipe(*values):
+    """Join the non-empty values with '|'."""
+    return "|".join(filter(None, values))
+
+def make_row_number():
+    """Return a counter producing "1", "2", ... for each row."""
+    counter = 0
+    def row_number():
+        nonlocal counter
+        counter += 1
+        return str(counter)
+    return row_number
+
+def make_household_id():
+    """Return a transform that starts a new household whenever the last name changes."""
     family_id = 1
     previous_last_name = None
-    remote_id_counter = 1
-    current_year = 2025  # Adjust as needed
-
-    for row in reader:
-        # Household logic
-        last_name = row.get("Last Name", "")
+    def household_id(last_name):
+        nonlocal family_id, previous_last_name
         if last_name and last_name != previous_last_name:
             family_id += 1
             previous_last_name = last_name
-        household_id = str(family_id) if last_name else "1"
-
-        # Generate remote_id
-        remote_id = str(remote_id_counter)
-        remote_id_counter += 1
-
-        # Format dates
-        birthdate = format_birthdate(row.get("Birth Month and Day", ""), row.get("Age", ""))
-        anniversary = format_anniversary(row.get("Wedding Month and Day", ""))
-
-        # Process medical notes
-        medical_notes = row.get("Allergy", "").lower()
-        if medical_notes == "no":
-            medical_notes = ""
-
-        # Map grade
-        grade = map_grade(row.get("School Grade", ""))
-
-        # Format phone numbers
-        mobile_phone = format_phone(row.get("Cell Phone", ""))
-        home_phone = format_phone(row.get("Home Phone", ""))
-        work_phone = format_phone(row.get("Work Phone", ""))
-
-        # Baptized status
-        baptized = yes_no_to_true_false(row.get("Baptized", ""))
-
-        # Status and Membership
-        status, membership = get_status_and_membership(row.get("Member Status", ""))
-
-        # Authorized pickup
-        authorized_pickup = "|".join(filter(None, [row.get(f"Authorized Pick up {i}", "") for i in range(1, 9)]))
-
-        # Household primary contact
-        relationship = row.get("Relationship", "")
-        household_primary_contact = "TRUE" if relationship == "Head of Household" else "TRUE" if row.get("Primary Contact", "").lower() == "yes" else ""
-
-        # Emergency contact logic
-        emergency_contact = row.get("Emergency Contact", "")
-        if not emergency_contact:
-            primary_contact = row.get("Primary Contact", "")
-            first_name = row.get("First Name", "").lower()
-            if primary_contact:
-                primary_first_name = primary_contact.split()[0].lower() if primary_contact.split() else ""
-                if primary_first_name != first_name:
-                    emergency_contact = primary_contact
-                else:
-                    emergency_contact = row.get("Secondary Contact", "")
+        return str(family_id) if last_name else "1"
+    return household_id
+
+# Transforms available to the mapping spec
+TRANSFORMS = {
+    "format_phone": format_phone,
+    "yes_no_to_true_false": yes_no_to_true_false,
+    "map_grade": format_grade,
+    "format_birthdate": format_birthdate,
+    "format_anniversary": format_anniversary,
+    "medical_notes": format_medical_notes,
+    "status": get_status,
+    "membership": get_membership,
+    "household_name": format_household_name,
+    "household_primary_contact": get_household_primary_contact,
+    "emergency_contact": get_emergency_contact,
+    "join_pipe": join_pipe,
+}
+
+# Transforms that keep state across rows; a fresh one is built per compile
+STATEFUL_TRANSFORMS = {
+    "row_number": make_row_number,
+    "household_id": make_household_id,
+}
+
+# Transforms worth caching per value (exports repeat phones, grades and dates a lot)
+MEMOIZED_TRANSFORMS = {"format_phone", "map_grade", "format_birthdate", "format_anniversary"}
+
+def load_spec(spec_file):
+    """Load a column mapping spec from JSON or YAML."""
+    with open(spec_file, 'r', encoding='utf-8') as f:
+        if spec_file.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML specs (pip install pyyaml).")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def compile_spec(spec, constants=None):
+    """Compile a mapping spec into a row function and the output headers.
+
+    Each column has a "target" header, optional "source" column(s) and an
+    optional "transform" name. A source starting with "$" refers to one of
+    the spec's constants instead of an input column. The columns are turned
+    into a single generated function so each row is one dict build with no
+    per-column lookups of the spec.
+    """
+    constants = {**spec.get("constants", {}), **(constants or {})}
+    namespace = {}
+    transforms = {}
+    headers = []
+    fields = []
+    for i, column in enumerate(spec["columns"]):
+        target = column["target"]
+        sources = column.get("source", [])
+        if isinstance(sources, str):
+            sources = [sources]
+
+        args = []
+        for source in sources:
+            if source.startswith("$"):
+                if source[1:] not in constants:
+                    raise ValueError(f"Column '{target}' uses unknown constant '{source}'.")
+                name = f"c{i}_{len(args)}"
+                namespace[name] = constants[source[1:]]
+                args.append(name)
+            else:
+                args.append(f"get({source!r}, '')")
+
+        transform = column.get("transform")
+        if transform is None:
+            if len(args) != 1:
+                raise ValueError(f"Column '{target}' needs a transform to combine {len(args)} sources.")
+            expr = args[0]
+        else:
+            if transform in STATEFUL_TRANSFORMS:
+                func = STATEFUL_TRANSFORMS[transform]()
+            elif transform in TRANSFORMS:
+                if transform not in transforms:
+                    func = TRANSFORMS[transform]
+                    if transform in MEMOIZED_TRANSFORMS:
+                        func = lru_cache(maxsize=None)(func)
+                    transforms[transform] = func
+                func = transforms[transform]
             else:
-                emergency_contact = row.get("Secondary Contact", "")
-
-        # Construct output row
-        output_row = {
-            "remote_id": remote_id,
-            "First Name": row.get("First Name", ""),
-            "Middle Name": row.get("Middle Name", ""),
-            "Last Name": last_name,
-            "Birthdate": birthdate,
-            "Anniversary": anniversary,
-            "Gender": row.get("Gender", ""),
-            "Grade": str(grade) if grade != "" else "",
-            "Medical Notes": medical_notes,
-            "Marital Status": row.get("Marital Status", ""),
-            "Status": status,
-            "Membership": membership,
-            "Home Address Street Line 1": row.get("Address", ""),
-            "Home Address City": row.get("City", ""),
-            "Home Address State": row.get("State", ""),
-            "Home Address Zip Code": row.get("Zip Code", ""),
-            "Mobile Phone Number": mobile_phone,
-            "Home Phone Number": home_phone,
-            "Work Phone Number": work_phone,
-            "Home Email": row.get("E-Mail", ""),
-            "Household ID": household_id,
-            "Household Name": f"{last_name} Household" if last_name else "",
-            "Household Primary Contact": household_primary_contact,
-            "Baptized": baptized,
-            "Baptism Date": row.get("Baptized Date", ""),
-            "Member By": row.get("How Joined", ""),
-            "Membership Date": row.get("Date Joined", ""),
-            "Sunday School": row.get("Sunday School", ""),
-            "Small Group": row.get("Activities", ""),  # Maps Child/Youth Group Activities
-            "Emergency Contact": emergency_contact,
-            "Emergency Phone": format_phone(row.get("Emergency Phone", "")),
-            "Allergies": row.get("Allergy", ""),
-            "Authorized Pickup": authorized_pickup
-        }
-        writer.writerow(output_row)
-
-print(f"CSV transformation complete. Output saved to {output_file}")
+                raise ValueError(f"Column '{target}' uses unknown transform '{transform}'.")
+            name = f"t{i}"
+            namespace[name] = func
+            expr = f"{name}({', '.join(args)})"
+
+        headers.append(target)
+        fields.append(f"        {target!r}: {expr},")
+
+    source = "def convert_row(row):\n    get = row.get\n    return {\n" + "\n".join(fields) + "\n    }\n"
+    exec(compile(source, "<import mapping>", "exec"), namespace)
+    return namespace["convert_row"], headers
+
+def convert_csv(input_file, output_file, spec, constants=None):
+    """Write the PCO import CSV for input_file using the mapping spec."""
+    convert_row, output_headers = compile_spec(spec, constants)
+    with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8', newline='') as outfile:
+        reader = csv.DictReader(infile)
+        writer = csv.DictWriter(outfile, fieldnames=output_headers)
+        writer.writeheader()
+        writer.writerows(map(convert_row, reader))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a legacy member export into a PCO People import CSV")
+    parser.add_argument("--input", type=str, default="input.csv", help="Legacy export CSV")
+    parser.add_argument("--output", type=str, default="output.csv", help="PCO import CSV to write")
+    parser.add_argument(
+        "--spec",
+        type=str,
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_mapping.json"),
+        help="Column mapping spec (JSON, or YAML with PyYAML installed)"
+    )
+    parser.add_argument("--current-year", type=int, help="Year used to turn ages into birth years (overrides the spec)")
+    args = parser.parse_args()
+
+    constants = {}
+    if args.current_year:
+        constants["current_year"] = args.current_year
+
+    convert_csv(args.input, args.output, load_spec(args.spec), constants)
+    print(f"CSV transformation complete. Output saved to {args.output}")
@@ -1,14 +1,20 @@
 import requests
 import time
 import os
+import math
+import argparse
 from requests.auth import HTTPBasicAuth
+from pco_plan import get_total_count, print_plan
 
 # Configuration
-BASE_URL = "https://api.planningcenteronline.com/people/v2/people"
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2/people"
 APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
 SECRET = os.environ.get("PCO_SECRET", "")
 HEADERS = {
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
 }
 AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
 
@@ -29,8 +35,8 @@ def get_all_people():
                 print(person)
                 people_ids.append(person["id"])
 
-            # Check for next page
-            url = data["meta"].get("next", {}).get("href", None)
+            # Check for next page in links
+            url = data["links"].get("next", None)
 
             # If next url exists, clear params
             if url:
@@ -58,8 +64,8 @@ def delete_person(person_id):
     except requests.RequestException as e:
         print(f"Error deleting person ID {person_id}: {e}")
 
-def delete_all_people():
-    """Delete all people records."""
+def delete_all_people(skip_ids=()):
+    """Delete all people records, except any IDs in skip_ids."""
     if not APPLICATION_ID or not SECRET:
         print("Error: Application ID or Secret not set in environment variables.")
         return
@@ -81,19 +87,34 @@ def delete_all_people():
     for i, person_id in enumerate(people_ids, 1):
         print(f"Deleting {i}/{total}...")
 
-        # Choose to skip a person if desired
-        #TODO make into CLI option
-        if person_id == "ID_HERE":
+        if person_id in skip_ids:
             print(f"Skipping ID {person_id}")
         else:
             delete_person(person_id)
 
     print("Deletion process complete.")
 
+def plan_delete_all_people():
+    """Estimate the requests and runtime of delete_all_people without changing anything."""
+    total, rate_headers, latency = get_total_count(BASE_URL, HEADERS, AUTH)
+    print(f"Found {total} people to delete.")
+    print_plan(math.ceil(total / 100), total, rate_headers, latency)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete people from Planning Center People")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--person-id", type=str, help="Delete a single person by ID")
+    group.add_argument("--all", action="store_true", help="Delete every person (asks for confirmation)")
+    group.add_argument("--plan", action="store_true", help="Only estimate requests and runtime for --all")
+    parser.add_argument("--skip", type=str, action="append", default=[], help="Person ID to keep when using --all (repeatable)")
+    args = parser.parse_args()
+
     try:
-        #TODO Change for CLI option to choose between the two
-        #delete_person(12345678)
-        #delete_all_people()
+        if args.plan:
+            plan_delete_all_people()
+        elif args.person_id:
+            delete_person(args.person_id)
+        else:
+            delete_all_people(args.skip)
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -1,13 +1,19 @@
 import requests
 import time
 import os
+import math
+import argparse
 from requests.auth import HTTPBasicAuth
+from pco_plan import get_total_count, print_plan
 
-BASE_URL = "https://api.planningcenteronline.com/people/v2"
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
 APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
 SECRET = os.environ.get("PCO_SECRET", "")
 HEADERS = {
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
 }
 AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
 
@@ -61,8 +67,21 @@ def delete_birthdays():
         except requests.RequestException as e:
             print(f"[{i}/{total}] Error updating person ID {person_id}: {e}")
 
+def plan_delete_birthdays():
+    """Estimate the requests and runtime of delete_birthdays without changing anything."""
+    total, rate_headers, latency = get_total_count(f"{BASE_URL}/people", HEADERS, AUTH)
+    print(f"Found {total} people to update birthdays.")
+    print_plan(math.ceil(total / 100), total, rate_headers, latency)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clear the birthday of every person")
+    parser.add_argument("--plan", action="store_true", help="Only estimate requests and runtime")
+    args = parser.parse_args()
+
     try:
-        delete_birthdays()
+        if args.plan:
+            plan_delete_birthdays()
+        else:
+            delete_birthdays()
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -3,11 +3,14 @@ import time
 import os
 from requests.auth import HTTPBasicAuth
 
-BASE_URL = "https://api.planningcenteronline.com/people/v2"
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
 APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
 SECRET = os.environ.get("PCO_SECRET", "")
 HEADERS = {
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
 }
 AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
 
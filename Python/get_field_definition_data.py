@@ -2,13 +2,22 @@ import requests
 import time
 import os
 import argparse
+import csv
+import json
+import sqlite3
+import sys
+import pathlib
+from contextlib import closing
 from requests.auth import HTTPBasicAuth
 
-BASE_URL = "https://api.planningcenteronline.com/people/v2"
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
 APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
 SECRET = os.environ.get("PCO_SECRET", "")
 HEADERS = {
-    "Content-Type": "application/json"
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "interactive"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
 }
 AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
 
@@ -79,6 +88,123 @@ def get_field_data(field_definition_id):
             break
     return field_data
 
+def open_cache(cache_file):
+    """Open the webhook-maintained cache (see people_webhook_cache.py) read-only."""
+    path = pathlib.Path(cache_file)
+    if not path.is_file():
+        raise ValueError(f"Cache file '{cache_file}' not found. Run people_webhook_cache.py seed first.")
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+
+def get_all_people_ids_from_cache(cache_file):
+    """Read all people IDs from the webhook-maintained cache."""
+    with closing(open_cache(cache_file)) as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM people")]
+
+def get_field_data_from_cache(cache_file, field_definition_id):
+    """Read field data entries for a field definition from the webhook-maintained cache."""
+    with closing(open_cache(cache_file)) as conn:
+        rows = conn.execute(
+            "SELECT id, value, person_id FROM field_data WHERE field_definition_id = ?",
+            (str(field_definition_id),)
+        )
+        return [{"id": id, "value": value, "person_id": person_id} for id, value, person_id in rows]
+
+def get_field_definitions():
+    """Fetch the whole field definition catalog as {definition_id: name}."""
+    definitions = {}
+    url = f"{BASE_URL}/field_definitions"
+    params = {"per_page": 100}
+    while url:
+        try:
+            response = requests.get(url, headers=HEADERS, auth=AUTH, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for definition in data["data"]:
+                definitions[definition["id"]] = definition["attributes"]["name"]
+            url = data["links"].get("next", None)
+            if url:
+                params = {}
+            time.sleep(0.2)
+        except requests.RequestException as e:
+            print(f"Error fetching field definitions: {e}")
+            raise
+    return definitions
+
+def stream_field_data():
+    """Yield every field data entry, across all definitions, in one paginated scan."""
+    url = f"{BASE_URL}/field_data"
+    params = {"per_page": 100}  # Max 100 per page per API docs
+    while url:
+        try:
+            response = requests.get(url, headers=HEADERS, auth=AUTH, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for entry in data["data"]:
+                relationships = entry["relationships"]
+                yield {
+                    "id": entry["id"],
+                    "value": entry["attributes"]["value"],
+                    "person_id": relationships["customizable"]["data"]["id"],
+                    "field_definition_id": relationships["field_definition"]["data"]["id"]
+                }
+            url = data["links"].get("next", None)
+            if url:
+                params = {}
+            time.sleep(0.2)
+        except requests.RequestException as e:
+            print(f"Error fetching field data: {e}")
+            break
+
+def stream_field_data_from_cache(cache_file):
+    """Yield every field data entry from the webhook-maintained cache."""
+    with closing(open_cache(cache_file)) as conn:
+        rows = conn.execute("SELECT id, value, person_id, field_definition_id FROM field_data")
+        for id, value, person_id, field_definition_id in rows:
+            yield {"id": id, "value": value, "person_id": person_id, "field_definition_id": field_definition_id}
+
+def select_field_definitions(definitions, field_names=None):
+    """Narrow the catalog to the named fields, or keep all of them if none are given."""
+    if not field_names:
+        return definitions
+    selected = {}
+    for field_name in field_names:
+        ids = [id for id, name in definitions.items() if name == field_name]
+        if not ids:
+            raise ValueError(f"Field definition '{field_name}' not found.")
+        for id in ids:
+            selected[id] = field_name
+    return selected
+
+def pivot_field_data(field_data, definitions):
+    """Pivot field data into {person_id: {field_name: value}}.
+
+    Only the fields a person actually has are stored, so the table stays as
+    sparse as the data. Repeated values for one field (e.g. checkbox options)
+    are joined with '|'.
+    """
+    table = {}
+    for entry in field_data:
+        field_name = definitions.get(entry["field_definition_id"])
+        if field_name is None:
+            continue
+        row = table.setdefault(entry["person_id"], {})
+        if field_name in row:
+            row[field_name] = f"{row[field_name]}|{entry['value']}"
+        else:
+            row[field_name] = entry["value"]
+    return table
+
+def write_pivot(table, field_names, outfile, output_format="csv"):
+    """Write the person-by-field table as CSV or JSON lines."""
+    if output_format == "jsonl":
+        for person_id, fields in table.items():
+            outfile.write(json.dumps({"person_id": person_id, **fields}) + "\n")
+        return
+    writer = csv.DictWriter(outfile, fieldnames=["person_id"] + field_names)
+    writer.writeheader()
+    for person_id, fields in table.items():
+        writer.writerow({"person_id": person_id, **fields})
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Query Planning Center Online API")
     parser.add_argument(
@@ -86,18 +212,67 @@ if __name__ == "__main__":
         type=str,
         help="Name of the field definition to query (e.g., 'Grade' or 'Medical Notes')"
     )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="Read people and field data from a local cache kept by people_webhook_cache.py instead of paging the API"
+    )
+    parser.add_argument(
+        "--fields",
+        type=str,
+        help="Comma separated field definitions to export in one pass (e.g., 'Grade,Medical Notes')"
+    )
+    parser.add_argument(
+        "--all-fields",
+        action="store_true",
+        help="Export every field definition in one pass"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        default="csv",
+        help="Output format for --fields/--all-fields"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="File to write the --fields/--all-fields export to (defaults to stdout)"
+    )
     args = parser.parse_args()
 
     try:
-        if args.field:
+        if args.fields or args.all_fields:
+            if "PCO_PRIORITY" not in os.environ:
+                HEADERS["X-PCO-Priority"] = "bulk"  # Full scans shouldn't crowd out interactive lookups
+            field_names = [name.strip() for name in args.fields.split(",")] if args.fields else None
+            definitions = select_field_definitions(get_field_definitions(), field_names)
+            if args.cache:
+                field_data = stream_field_data_from_cache(args.cache)
+            else:
+                field_data = stream_field_data()
+            table = pivot_field_data(field_data, definitions)
+            columns = list(dict.fromkeys(definitions.values()))
+            if args.output:
+                with open(args.output, "w", encoding="utf-8", newline="") as outfile:
+                    write_pivot(table, columns, outfile, args.format)
+                print(f"Wrote {len(table)} people x {len(columns)} fields to {args.output}")
+            else:
+                write_pivot(table, columns, sys.stdout, args.format)
+        elif args.field:
             field_id = get_field_definition_id(args.field)
             print(f"Field definition ID for '{args.field}': {field_id}")
-            field_data = get_field_data(field_id)
+            if args.cache:
+                field_data = get_field_data_from_cache(args.cache, field_id)
+            else:
+                field_data = get_field_data(field_id)
             print(f"Data for field '{args.field}':")
             for entry in field_data:
                 print(f"Person ID: {entry['person_id']}, Value: {entry['value']}, Field Data ID: {entry['id']}")
         else:
-            people_ids = get_all_people_ids()
+            if args.cache:
+                people_ids = get_all_people_ids_from_cache(args.cache)
+            else:
+                people_ids = get_all_people_ids()
             print(f"Fetched {len(people_ids)} people IDs.")
     except Exception as e:
         print(f"An error occurred: {e}")
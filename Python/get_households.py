@@ -0,0 +1,122 @@
+import requests
+import time
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.auth import HTTPBasicAuth
+
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
+APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
+SECRET = os.environ.get("PCO_SECRET", "")
+HEADERS = {
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
+}
+AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
+
+PER_PAGE = 100  # Max 100 per page per API docs
+REQUEST_INTERVAL = 0.2  # Basic rate limiting: 5 requests/sec shared by all workers
+
+_pace_lock = threading.Lock()
+_next_request = 0.0
+
+def _wait_for_turn():
+    """Space request starts REQUEST_INTERVAL apart across threads."""
+    global _next_request
+    with _pace_lock:
+        now = time.monotonic()
+        wait = _next_request - now
+        _next_request = max(now, _next_request) + REQUEST_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+def get_households_page(offset):
+    """Fetch one page of households with their people included."""
+    url = f"{BASE_URL}/households"
+    params = {"include": "people", "per_page": PER_PAGE, "offset": offset}
+    while True:
+        _wait_for_turn()
+        response = requests.get(url, headers=HEADERS, auth=AUTH, params=params)
+        if response.status_code == 429:
+            time.sleep(int(response.headers.get("Retry-After", 1)))
+            continue
+        response.raise_for_status()
+        return response.json()
+
+def get_all_household_pages(workers=4):
+    """Fetch every households page, requesting pages after the first concurrently."""
+    first = get_households_page(0)
+    total = first["meta"]["total_count"]
+    offsets = range(PER_PAGE, total, PER_PAGE)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [first] + list(executor.map(get_households_page, offsets))
+
+def build_household_index(pages):
+    """Build household and person-to-household lookups from households pages.
+
+    Returns a dict with:
+      households: {household_id: {"name", "primary_contact_id", "people"}}
+      person_households: {person_id: [household_id, ...]}
+      people: {person_id: name}
+    """
+    households = {}
+    person_households = {}
+    people = {}
+    for page in pages:
+        for household in page["data"]:
+            household_id = household["id"]
+            attributes = household["attributes"]
+            member_ids = [p["id"] for p in household["relationships"]["people"]["data"]]
+            households[household_id] = {
+                "name": attributes.get("name"),
+                "primary_contact_id": attributes.get("primary_contact_id"),
+                "people": member_ids
+            }
+            for person_id in member_ids:
+                person_households.setdefault(person_id, []).append(household_id)
+        for included in page.get("included", []):
+            if included["type"] == "Person":
+                people[included["id"]] = included["attributes"].get("name")
+    return {"households": households, "person_households": person_households, "people": people}
+
+def get_household_index(workers=4):
+    """Fetch all households and return the household index."""
+    return build_household_index(get_all_household_pages(workers))
+
+def get_person_households(index, person_id):
+    """Return the households a person belongs to, with whether they are the primary contact."""
+    result = []
+    for household_id in index["person_households"].get(str(person_id), []):
+        household = index["households"][household_id]
+        result.append({
+            "household_id": household_id,
+            "name": household["name"],
+            "primary_contact_id": household["primary_contact_id"],
+            "is_primary_contact": household["primary_contact_id"] == str(person_id)
+        })
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch all PCO households and index people by household")
+    parser.add_argument("--workers", type=int, default=4, help="Pages fetched concurrently")
+    parser.add_argument("--person-id", type=str, help="Print the households for this person")
+    parser.add_argument("--output", type=str, help="Write the full index to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        index = get_household_index(args.workers)
+        print(f"Fetched {len(index['households'])} households covering {len(index['person_households'])} people.")
+        if args.person_id:
+            for household in get_person_households(index, args.person_id):
+                contact = " (primary contact)" if household["is_primary_contact"] else ""
+                print(f"Household ID: {household['household_id']}, Name: {household['name']}{contact}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            print(f"Household index saved to {args.output}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
@@ -0,0 +1,190 @@
+import requests
+import time
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Scripts send their requests here when PCO_BROKER_URL is set (e.g. http://127.0.0.1:8765),
+# tagged with X-PCO-Priority (interactive or bulk) and X-PCO-Client (the job, for fair queuing).
+UPSTREAM_URL = "https://api.planningcenteronline.com"
+PRIORITY_HEADER = "X-PCO-Priority"
+CLIENT_HEADER = "X-PCO-Client"
+PRIORITIES = {"interactive": 0, "bulk": 1}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+# Hop-by-hop and broker-only headers that are not forwarded
+SKIP_REQUEST_HEADERS = {"host", "connection", "content-length", "accept-encoding", PRIORITY_HEADER.lower(), CLIENT_HEADER.lower()}
+SKIP_RESPONSE_HEADERS = {"connection", "content-length", "content-encoding", "transfer-encoding"}
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/sec up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, tokens):
+        """Seconds until at least `tokens` are available."""
+        self.refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Empty the bucket so nothing is sent for `seconds` (after a 429)."""
+        self.refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+class Scheduler(threading.Thread):
+    """Grants send slots for one credential from a single token bucket.
+
+    Interactive requests always go first. Bulk requests only spend tokens
+    above `reserve`, so an interactive call arriving mid-job never waits
+    for a refill. Within a priority, clients are served round-robin so one
+    job can't starve another.
+    """
+
+    def __init__(self, rate, capacity, reserve):
+        super().__init__(daemon=True)
+        self.bucket = TokenBucket(rate, capacity)
+        self.reserve = reserve
+        self.cond = threading.Condition()
+        self.queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+
+    def acquire(self, priority, client):
+        """Block until this request may be sent."""
+        ready = threading.Event()
+        with self.cond:
+            self.queues[priority].setdefault(client, deque()).append(ready)
+            self.cond.notify()
+        ready.wait()
+
+    def pause(self, seconds):
+        with self.cond:
+            self.bucket.pause(seconds)
+            self.cond.notify()
+
+    def observe(self, headers):
+        """Follow the rate limit PCO reports for this credential."""
+        limit = headers.get("X-PCO-API-Request-Rate-Limit")
+        period = headers.get("X-PCO-API-Request-Rate-Period")
+        if limit and period:
+            with self.cond:
+                self.bucket.rate = int(limit) / int(period)
+
+    def run(self):
+        with self.cond:
+            while True:
+                priority = next((p for p in sorted(self.queues) if self.queues[p]), None)
+                if priority is None:
+                    self.cond.wait()
+                    continue
+                needed = 1 if priority == PRIORITIES["interactive"] else 1 + self.reserve
+                wait = self.bucket.time_until(needed)
+                if wait > 0:
+                    self.cond.wait(wait)  # Woken early if a higher priority request arrives
+                    continue
+                # Take the next request from the client at the front, then move that client to the back
+                client, waiting = self.queues[priority].popitem(last=False)
+                ready = waiting.popleft()
+                if waiting:
+                    self.queues[priority][client] = waiting
+                self.bucket.take()
+                ready.set()
+
+class Broker:
+    """One scheduler per credential, created on first use."""
+
+    def __init__(self, rate, capacity, reserve):
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self.schedulers = {}
+        self.lock = threading.Lock()
+
+    def scheduler_for(self, credential):
+        with self.lock:
+            if credential not in self.schedulers:
+                scheduler = Scheduler(self.rate, self.capacity, self.reserve)
+                scheduler.start()
+                self.schedulers[credential] = scheduler
+            return self.schedulers[credential]
+
+def make_handler(broker):
+    """Build a request handler that forwards everything through the broker."""
+
+    class BrokerHandler(BaseHTTPRequestHandler):
+        def proxy(self):
+            priority = PRIORITIES.get(self.headers.get(PRIORITY_HEADER, "bulk"), PRIORITIES["bulk"])
+            client = self.headers.get(CLIENT_HEADER) or self.client_address[0]
+            scheduler = broker.scheduler_for(self.headers.get("Authorization", ""))
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))) or None
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in SKIP_REQUEST_HEADERS}
+
+            start = time.monotonic()
+            while True:
+                scheduler.acquire(priority, client)
+                try:
+                    response = requests.request(self.command, UPSTREAM_URL + self.path, headers=headers, data=body)
+                except requests.RequestException as e:
+                    print(f"Error forwarding {self.command} {self.path}: {e}")
+                    self.send_response(502)
+                    self.end_headers()
+                    return
+                scheduler.observe(response.headers)
+                if response.status_code != 429:
+                    break
+                retry_after = int(response.headers.get("Retry-After", 1))
+                print(f"429 from PCO, pausing {retry_after}s")
+                scheduler.pause(retry_after)
+
+            # Keep pagination links pointing at the broker
+            content = response.content.replace(UPSTREAM_URL.encode(), f"http://{self.headers['Host']}".encode())
+            self.send_response(response.status_code)
+            for key, value in response.headers.items():
+                if key.lower() not in SKIP_RESPONSE_HEADERS:
+                    self.send_header(key, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            print(f"[{PRIORITY_NAMES[priority]}] {client} {self.command} {self.path} -> "
+                  f"{response.status_code} ({time.monotonic() - start:.2f}s)")
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = proxy
+
+        def log_message(self, format, *args):
+            pass
+
+    return BrokerHandler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local broker that shares one PCO rate budget per credential between scripts. "
+                    "Point scripts at it with PCO_BROKER_URL=http://HOST:PORT."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests/sec per credential until PCO reports its limit")
+    parser.add_argument("--burst", type=int, default=10, help="Token bucket capacity")
+    parser.add_argument("--reserve", type=int, default=2, help="Tokens bulk requests leave for interactive ones")
+    args = parser.parse_args()
+    if args.reserve >= args.burst:
+        parser.error("--reserve must be smaller than --burst")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(Broker(args.rate, args.burst, args.reserve)))
+    print(f"PCO broker listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
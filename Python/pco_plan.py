@@ -0,0 +1,34 @@
+import requests
+import time
+
+# Shared by the --plan modes of the bulk scripts (delete_all.py, delete_birthdays.py,
+# clean_authorized_pickups.py), which import it from this directory.
+
+def get_total_count(url, headers, auth, params=None):
+    """Count a collection with a per_page=1 query.
+
+    Returns (meta.total_count, response headers, request seconds).
+    """
+    params = dict(params or {}, per_page=1)
+    start = time.monotonic()
+    response = requests.get(url, headers=headers, auth=auth, params=params)
+    elapsed = time.monotonic() - start
+    response.raise_for_status()
+    return response.json()["meta"]["total_count"], response.headers, elapsed
+
+def print_plan(reads, writes, rate_headers, latency, delay=0.2):
+    """Report expected requests and wall time for a run that sends one request at a time."""
+    limit = int(rate_headers.get("X-PCO-API-Request-Rate-Limit", 100))
+    period = int(rate_headers.get("X-PCO-API-Request-Rate-Period", 20))
+    used = int(rate_headers.get("X-PCO-API-Request-Rate-Count", 0))
+    total = reads + writes
+    paced = total * (latency + delay)  # Latency plus the sleep after each request
+    budgeted = total * period / limit
+    seconds = max(paced, budgeted)
+    hours, remainder = divmod(int(seconds), 3600)
+    print(f"Expected reads: {reads}")
+    print(f"Expected writes: {writes}")
+    print(f"Rate limit: {limit} requests per {period}s ({used} used in the current window)")
+    print(f"Measured latency: {latency:.2f}s per request")
+    print(f"Projected wall time: {hours}h {remainder // 60}m "
+          f"({'script pacing' if paced >= budgeted else 'rate limit'} bound)")
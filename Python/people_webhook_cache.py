@@ -0,0 +1,323 @@
+import requests
+import time
+import os
+import json
+import hmac
+import hashlib
+import queue
+import sqlite3
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.auth import HTTPBasicAuth
+
+API_URL = os.environ.get("PCO_BROKER_URL", "https://api.planningcenteronline.com")  # See pco_broker.py
+BASE_URL = f"{API_URL}/people/v2"
+APPLICATION_ID = os.environ.get("PCO_APPLICATION_ID", "")
+SECRET = os.environ.get("PCO_SECRET", "")
+HEADERS = {
+    "Content-Type": "application/json",
+    "X-PCO-Priority": os.environ.get("PCO_PRIORITY", "bulk"),
+    "X-PCO-Client": f"{os.path.basename(__file__)}:{os.getpid()}"
+}
+AUTH = HTTPBasicAuth(APPLICATION_ID, SECRET)
+
+# Each webhook subscription has its own authenticity secret; separate several with commas
+WEBHOOK_SECRETS = [s for s in os.environ.get("PCO_WEBHOOK_SECRET", "").split(",") if s]
+SIGNATURE_HEADER = "X-PCO-Webhooks-Authenticity"
+DEFAULT_CACHE = "people_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    id TEXT PRIMARY KEY,
+    attributes TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS field_data (
+    id TEXT PRIMARY KEY,
+    person_id TEXT,
+    field_definition_id TEXT,
+    value TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tombstones (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS field_data_definition ON field_data (field_definition_id);
+CREATE INDEX IF NOT EXISTS field_data_person ON field_data (person_id);
+"""
+
+# Only write when the incoming row is at least as new as the stored one.
+# PCO timestamps are all ISO 8601 UTC in the same format, so they compare as strings.
+NEWER_ONLY = "WHERE {table}.updated_at IS NULL OR excluded.updated_at IS NULL OR excluded.updated_at >= {table}.updated_at"
+
+def open_cache(cache_file):
+    """Open (and create if needed) the on-disk people cache."""
+    conn = sqlite3.connect(cache_file, timeout=30)
+    conn.executescript(SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(field_data)")]
+    if "updated_at" not in columns:  # Caches created before field data timestamps were kept
+        conn.execute("ALTER TABLE field_data ADD COLUMN updated_at TEXT")
+    return conn
+
+def sign(body, secret):
+    """HMAC-SHA256 hex digest PCO sends in the authenticity header."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+def verify_signature(body, signature, secrets):
+    """Check a delivery body against any of the configured secrets."""
+    if not signature:
+        return False
+    return any(hmac.compare_digest(sign(body, secret), signature) for secret in secrets)
+
+def is_destroyed(conn, kind, id):
+    """True if a destroyed event was seen for this record (PCO never reuses IDs)."""
+    return conn.execute("SELECT 1 FROM tombstones WHERE kind = ? AND id = ?", (kind, id)).fetchone() is not None
+
+def upsert_person(conn, person):
+    """Insert or update a person from a JSON:API resource, unless the cached copy is newer."""
+    if is_destroyed(conn, "person", person["id"]):
+        return
+    attributes = person.get("attributes", {})
+    conn.execute(
+        "INSERT INTO people (id, attributes, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET attributes = excluded.attributes, updated_at = excluded.updated_at "
+        + NEWER_ONLY.format(table="people"),
+        (person["id"], json.dumps(attributes), attributes.get("updated_at"))
+    )
+
+def upsert_field_datum(conn, field_datum):
+    """Insert or update a field datum from a JSON:API resource, unless the cached copy is newer."""
+    relationships = field_datum.get("relationships", {})
+    person = (relationships.get("customizable") or {}).get("data") or {}
+    definition = (relationships.get("field_definition") or {}).get("data") or {}
+    if is_destroyed(conn, "field_datum", field_datum["id"]) or is_destroyed(conn, "person", person.get("id")):
+        return
+    attributes = field_datum.get("attributes", {})
+    conn.execute(
+        "INSERT INTO field_data (id, person_id, field_definition_id, value, updated_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET person_id = excluded.person_id, "
+        "field_definition_id = excluded.field_definition_id, value = excluded.value, updated_at = excluded.updated_at "
+        + NEWER_ONLY.format(table="field_data"),
+        (field_datum["id"], person.get("id"), definition.get("id"), attributes.get("value"), attributes.get("updated_at"))
+    )
+
+def apply_event(conn, name, resource):
+    """Apply one webhook event (e.g. people.v2.events.person.updated) to the cache."""
+    kind, action = name.split(".")[-2:]
+    if kind == "person":
+        if action == "destroyed":
+            conn.execute("INSERT OR IGNORE INTO tombstones (kind, id) VALUES ('person', ?)", (resource["id"],))
+            conn.execute("DELETE FROM people WHERE id = ?", (resource["id"],))
+            conn.execute("DELETE FROM field_data WHERE person_id = ?", (resource["id"],))
+        else:
+            upsert_person(conn, resource)
+    elif kind == "field_datum":
+        if action == "destroyed":
+            conn.execute("INSERT OR IGNORE INTO tombstones (kind, id) VALUES ('field_datum', ?)", (resource["id"],))
+            conn.execute("DELETE FROM field_data WHERE id = ?", (resource["id"],))
+        else:
+            upsert_field_datum(conn, resource)
+    else:
+        print(f"Ignoring unsupported event {name}")
+
+def parse_delivery(body):
+    """Return (event name, resource) pairs from a webhook delivery body."""
+    events = []
+    for delivery in json.loads(body)["data"]:
+        attributes = delivery["attributes"]
+        payload = attributes["payload"]
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        events.append((attributes["name"], payload["data"]))
+    return events
+
+class CacheWriter(threading.Thread):
+    """Single writer thread that applies queued events and commits in batches."""
+
+    def __init__(self, cache_file, batch_size=100, flush_interval=2.0):
+        super().__init__(daemon=True)
+        self.cache_file = cache_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events = queue.Queue()
+
+    def submit(self, events):
+        for event in events:
+            self.events.put(event)
+
+    def stop(self):
+        self.events.put(None)
+        self.join()
+
+    def run(self):
+        conn = open_cache(self.cache_file)
+        pending = 0
+        first_pending = 0.0
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0, first_pending + self.flush_interval - time.monotonic())
+            try:
+                event = self.events.get(timeout=timeout)
+            except queue.Empty:
+                event = False  # Flush interval elapsed
+            if event is None:
+                break
+            if event:
+                name, resource = event
+                try:
+                    apply_event(conn, name, resource)
+                    if not pending:
+                        first_pending = time.monotonic()
+                    pending += 1
+                except (KeyError, ValueError, sqlite3.Error) as e:
+                    print(f"Error applying {name}: {e}")
+            if pending and (pending >= self.batch_size or time.monotonic() - first_pending >= self.flush_interval):
+                conn.commit()
+                print(f"Committed {pending} events to {self.cache_file}")
+                pending = 0
+        if pending:
+            conn.commit()
+            print(f"Committed {pending} events to {self.cache_file}")
+        conn.close()
+
+def make_handler(writer, secrets, record_file=None):
+    """Build a request handler bound to the writer and secrets."""
+    record_lock = threading.Lock()
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not verify_signature(body, self.headers.get(SIGNATURE_HEADER), secrets):
+                self.send_response(401)
+                self.end_headers()
+                return
+            try:
+                events = parse_delivery(body)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Rejected malformed delivery: {e}")
+                self.send_response(400)
+                self.end_headers()
+                return
+            if record_file:
+                with record_lock, open(record_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(json.loads(body)) + "\n")  # One delivery per line
+            writer.submit(events)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return WebhookHandler
+
+def serve(cache_file, host, port, batch_size, flush_interval, record_file=None):
+    """Run the webhook receiver until interrupted."""
+    if not WEBHOOK_SECRETS:
+        print("Error: PCO_WEBHOOK_SECRET not set in environment variables.")
+        return
+    writer = CacheWriter(cache_file, batch_size, flush_interval)
+    writer.start()
+    server = ThreadingHTTPServer((host, port), make_handler(writer, WEBHOOK_SECRETS, record_file))
+    print(f"Listening for PCO webhooks on http://{host}:{port} (cache: {cache_file})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        writer.stop()
+
+def replay(delivery_file, url, secret, delay=0.0):
+    """POST recorded deliveries (one JSON body per line) to a receiver, signed like PCO does."""
+    sent = 0
+    with open(delivery_file, "r", encoding="utf-8") as f:
+        for line in f:
+            body = line.strip().encode("utf-8")
+            if not body:
+                continue
+            headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)}
+            response = requests.post(url, data=body, headers=headers)
+            if response.status_code != 200:
+                print(f"Delivery {sent + 1} rejected: {response.status_code}")
+            sent += 1
+            time.sleep(delay)
+    print(f"Replayed {sent} deliveries to {url}")
+
+def get_pages(url, params):
+    """Yield every resource from a paginated collection."""
+    while url:
+        try:
+            response = requests.get(url, headers=HEADERS, auth=AUTH, params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield from data["data"]
+            # Check for next page in links
+            url = data["links"].get("next", None)
+            if url:
+                params = {}  # Clear params for subsequent pages (URL has them)
+            time.sleep(0.2)  # Basic rate limiting: 5 requests/sec
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            break
+
+def seed(cache_file):
+    """Fill the cache with one full scan of people and field data.
+
+    Rows go through the same newer-only and tombstone checks as webhook
+    events, and are committed a page at a time, so seeding while the
+    receiver is running never overwrites fresher webhook data.
+    """
+    conn = open_cache(cache_file)
+    people = 0
+    for person in get_pages(f"{BASE_URL}/people", {"per_page": 100}):
+        upsert_person(conn, person)
+        people += 1
+        if people % 100 == 0:
+            conn.commit()
+    conn.commit()
+    field_data = 0
+    for field_datum in get_pages(f"{BASE_URL}/field_data", {"per_page": 100}):
+        upsert_field_datum(conn, field_datum)
+        field_data += 1
+        if field_data % 100 == 0:
+            conn.commit()
+    conn.commit()
+    conn.close()
+    print(f"Seeded {people} people and {field_data} field data entries into {cache_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep a local People cache current from PCO webhooks")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="SQLite cache file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the webhook receiver")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--batch-size", type=int, default=100, help="Events per commit")
+    serve_parser.add_argument("--flush-interval", type=float, default=2.0, help="Max seconds before committing")
+    serve_parser.add_argument("--record", type=str, help="Append verified deliveries to this file for replay")
+
+    replay_parser = subparsers.add_parser("replay", help="Send recorded deliveries to a receiver")
+    replay_parser.add_argument("deliveries", type=str, help="File with one delivery body per line")
+    replay_parser.add_argument("--url", type=str, default="http://127.0.0.1:8080/")
+    replay_parser.add_argument("--delay", type=float, default=0.0, help="Seconds between deliveries")
+
+    subparsers.add_parser("seed", help="Fill the cache with one full scan")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "serve":
+            serve(args.cache, args.host, args.port, args.batch_size, args.flush_interval, args.record)
+        elif args.command == "replay":
+            if not WEBHOOK_SECRETS:
+                print("Error: PCO_WEBHOOK_SECRET not set in environment variables.")
+            else:
+                replay(args.deliveries, args.url, WEBHOOK_SECRETS[0], args.delay)
+        else:
+            seed(args.cache)
+    except Exception as e:
+        print(f"An error occurred: {e}")